@@ -0,0 +1,8 @@
+from __future__ import print_function, unicode_literals
+import sys
+
+from .watch import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
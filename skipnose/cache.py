@@ -0,0 +1,264 @@
+from __future__ import print_function, unicode_literals
+import ast
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+
+def find_package_root(path):
+    """
+    Find directory from which the module at the given path
+    can be imported by walking up all parent packages
+    """
+    root = os.path.dirname(path)
+    while os.path.exists(os.path.join(root, '__init__.py')):
+        parent = os.path.dirname(root)
+        if parent == root:
+            break
+        root = parent
+    return root
+
+
+def resolve_module(roots, name):
+    """
+    Resolve dotted module name to a list of files within the given roots.
+
+    Returned list includes all parent package ``__init__.py`` files
+    since they are executed when the module is imported.
+    Empty list is returned when module is not local to any of the roots
+    such as stdlib or installed packages.
+    """
+    parts = name.split('.')
+    for root in roots:
+        files = []
+        for i in range(1, len(parts) + 1):
+            path = os.path.join(root, *parts[:i])
+            if os.path.isfile(os.path.join(path, '__init__.py')):
+                files.append(os.path.join(path, '__init__.py'))
+            elif i == len(parts) and os.path.isfile(path + '.py'):
+                files.append(path + '.py')
+            else:
+                break
+        if len(files) == len(parts):
+            return files
+    return []
+
+
+def find_imports(path, source, roots):
+    """
+    Find all local files imported by the given module source
+
+    Parameters
+    ----------
+    path : str
+        Path of the module
+    source : bytes
+        Source of the module
+    roots : list
+        Directories from which absolute imports are resolved
+
+    Returns
+    -------
+    imports : list
+        Sorted list of imported local file paths
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, TypeError):
+        return []
+
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.update(resolve_module(roots, alias.name))
+
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = os.path.dirname(path)
+                for _ in range(node.level - 1):
+                    base = os.path.dirname(base)
+                search = [base]
+                prefix = node.module.split('.') if node.module else []
+            else:
+                search = roots
+                prefix = node.module.split('.')
+
+            if prefix:
+                imports.update(resolve_module(search, '.'.join(prefix)))
+            # imported names can be submodules as well
+            for alias in node.names:
+                imports.update(resolve_module(
+                    search, '.'.join(prefix + [alias.name])
+                ))
+
+    imports.discard(path)
+    return sorted(imports)
+
+
+class ResultCache(object):
+    """
+    Cache of test modules which passed in previous runs
+
+    Each test module is identified by a digest of its source,
+    sources of all local modules it imports transitively and
+    skipnose configuration. File digests and imports are only
+    recomputed when file mtime or size changes hence checking
+    an unchanged module only requires ``os.stat`` calls.
+
+    Attributes
+    ----------
+    path : str
+        Path of json file where cache is stored
+    config : str
+        Digest of the configuration which is included in all
+        module digests
+    roots : list
+        Directories from which absolute imports are resolved
+    files : dict
+        Mapping of file paths to ``[mtime, size, sha1, imports]``
+    modules : dict
+        Mapping of passed test module paths to their digest
+    """
+
+    def __init__(self, path, config, roots=None):
+        self.path = path
+        self.config = hashlib.sha1(
+            json.dumps(config, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        self.roots = roots or []
+        self.files = {}
+        self.modules = {}
+        self._digests = {}
+
+    def load(self):
+        """
+        Load cache from json file when it exists
+
+        Cache which cannot be read is ignored with a warning
+        hence all test modules are executed again.
+        """
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'rb') as fid:
+                data = json.loads(fid.read().decode('utf-8'))
+            files = data.get('files', {})
+            modules = data.get('modules', {})
+        except (AttributeError, ValueError, IOError, OSError) as e:
+            print(
+                'Skipnose: Ignoring invalid cache {} ({})'
+                ''.format(self.path, e),
+                file=sys.stderr
+            )
+            return
+
+        self.files = files
+        self.modules = modules
+
+    def save(self):
+        """
+        Save cache to json file
+
+        Cache is first written to a temporary file which then
+        replaces the cache file so that interrupted runs never
+        leave a partially written cache behind.
+        """
+        data = json.dumps(
+            {'files': self.files, 'modules': self.modules},
+            sort_keys=True,
+        )
+        fd, path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix='.skipnose',
+        )
+        try:
+            with os.fdopen(fd, 'wb') as fid:
+                fid.write(data.encode('utf-8'))
+            # os.rename does not replace existing files on Windows
+            getattr(os, 'replace', os.rename)(path, self.path)
+        except Exception:
+            os.remove(path)
+            raise
+
+    def is_passed(self, path):
+        """
+        Check whether module passed previously and it did not change since
+        """
+        digest = self.modules.get(path)
+        return digest is not None and digest == self.digest(path)
+
+    def record_pass(self, path, digest):
+        """
+        Record that the test module passed
+
+        Parameters
+        ----------
+        path : str
+            Path of the test module
+        digest : str
+            Digest of the module computed when it was loaded
+        """
+        self.modules[path] = digest
+
+    def record_failure(self, path):
+        """
+        Record that the test module failed
+        """
+        self.modules.pop(path, None)
+
+    def digest(self, path):
+        """
+        Compute digest of the module including all its local imports
+        """
+        if path in self._digests:
+            return self._digests[path]
+
+        sha = hashlib.sha1(self.config.encode('utf-8'))
+        seen = set()
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            entry = self._file(current)
+            if entry is None:
+                sha.update('{}:missing\n'.format(current).encode('utf-8'))
+                continue
+            sha.update('{}:{}\n'.format(current, entry[2]).encode('utf-8'))
+            pending.extend(entry[3])
+
+        self._digests[path] = sha.hexdigest()
+        return self._digests[path]
+
+    def _file(self, path):
+        """
+        Get ``[mtime, size, sha1, imports]`` of the file
+        only reading it when its mtime or size changed
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.files.pop(path, None)
+            return None
+
+        entry = self.files.get(path)
+        if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            return entry
+
+        with open(path, 'rb') as fid:
+            source = fid.read()
+
+        roots = [find_package_root(path)] + self.roots
+        entry = [
+            stat.st_mtime,
+            stat.st_size,
+            hashlib.sha1(source).hexdigest(),
+            find_imports(path, source, roots),
+        ]
+        self.files[path] = entry
+        return entry
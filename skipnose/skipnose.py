@@ -1,14 +1,19 @@
 from __future__ import print_function, unicode_literals
 import fnmatch
 import functools
+import inspect
 import json
 import os
 import re
 import sys
 
 from nose.case import FunctionTestCase
+from nose.failure import Failure
 from nose.plugins import Plugin
 from nose.plugins.skip import SkipTest
+from nose.util import getpackage, src
+
+from .cache import ResultCache
 
 
 def walk_subfolders(path):
@@ -21,6 +26,34 @@ def walk_subfolders(path):
             yield os.path.join(dirpath, dirname)
 
 
+def compile_glob(pattern):
+    """
+    Compile glob pattern to a case-sensitive regex
+    """
+    return re.compile(fnmatch.translate(pattern))
+
+
+def compile_path_glob(pattern):
+    """
+    Compile glob pattern to a regex which matches paths
+    normalized with ``os.path.normcase`` as ``fnmatch.fnmatch`` does
+    """
+    return compile_glob(os.path.normcase(pattern))
+
+
+def get_method_class(method):
+    """
+    Get the class the method was collected from by nose.
+
+    On Python 3 nose wraps methods in ``UnboundMethod``
+    which references the class via ``__self__.cls``.
+    """
+    cls = getattr(method, 'im_class', None)
+    if cls is None:
+        cls = getattr(getattr(method, '__self__', None), 'cls', None)
+    return cls
+
+
 class SkipNose(Plugin):
     """
     Nose plugin class for skipnose
@@ -28,9 +61,15 @@ class SkipNose(Plugin):
     Attributes
     ----------
     skipnose_include : list
-        List of glob patterns to include
+        List of compiled glob patterns of directories to include
     skipnose_exclude : list
-        List of glob patterns to exclude
+        List of compiled glob patterns of directories to exclude
+    skipnose_test_include : list
+        List of compiled glob patterns of test names to include
+    skipnose_test_exclude : list
+        List of compiled glob patterns of test names to exclude
+    skipnose_cache : ResultCache
+        Cache of previously passed test modules
     debug : bool
         Whether skipnose should print out debug messages
     """
@@ -38,13 +77,26 @@ class SkipNose(Plugin):
     env_opt = 'NOSE_SKIPNOSE'
     env_include_opt = 'NOSE_SKIPNOSE_INCLUDE'
     env_exclude_opt = 'NOSE_SKIPNOSE_EXCLUDE'
+    env_test_include_opt = 'NOSE_SKIPNOSE_TEST_INCLUDE'
+    env_test_exclude_opt = 'NOSE_SKIPNOSE_TEST_EXCLUDE'
+    env_cache_opt = 'NOSE_SKIPNOSE_CACHE'
 
     def __init__(self):
         super(SkipNose, self).__init__()
         self.debug = False
         self.skipnose_include = None
         self.skipnose_exclude = None
+        self._subfolders = {}
+        self.skipnose_test_include = None
+        self.skipnose_test_exclude = None
         self.skipnose_skip_tests = None
+        self.skipnose_cache = None
+        self._cached_modules = {}
+        self._loaded_modules = {}
+        self._run_modules = set()
+        self._failed_modules = set()
+        self._skipped_modules = set()
+        self._partial_run = False
 
     def options(self, parser, env=os.environ):
         """
@@ -62,6 +114,14 @@ class SkipNose(Plugin):
             bool, re.split(r'[,;:]', env.get(self.env_exclude_opt, ''))
         ))
 
+        skip_test_include = list(filter(
+            bool, re.split(r'[,;]', env.get(self.env_test_include_opt, ''))
+        ))
+
+        skip_test_exclude = list(filter(
+            bool, re.split(r'[,;:]', env.get(self.env_test_exclude_opt, ''))
+        ))
+
         parser.add_option(
             '--with-skipnose',
             action='store_true',
@@ -102,6 +162,30 @@ class SkipNose(Plugin):
                  '(alternatively, set ${env} as [,;:] delimited string)'
                  ''.format(env=self.env_exclude_opt)
         )
+        parser.add_option(
+            '--skipnose-test-include',
+            action='append',
+            default=skip_test_include,
+            dest='skipnose_test_include',
+            help='skipnose: which tests to include by their dotted name '
+                 '(e.g. module.Class.method) using glob syntax.'
+                 'Specifying multiple times will AND the clauses. '
+                 'Single parameter ":" delimited clauses will be ORed. '
+                 'Alternatively, set ${env} as [,;] delimited string for '
+                 'AND and [:] for OR.'
+                 ''.format(env=self.env_test_include_opt)
+        )
+        parser.add_option(
+            '--skipnose-test-exclude',
+            action='append',
+            default=skip_test_exclude,
+            dest='skipnose_test_exclude',
+            help='skipnose: which tests to exclude by their dotted name '
+                 '(e.g. module.Class.method) using glob syntax.'
+                 'Can be specified multiple times. '
+                 '(alternatively, set ${env} as [,;:] delimited string)'
+                 ''.format(env=self.env_test_exclude_opt)
+        )
         parser.add_option(
             '--skipnose-skip-tests',
             action='store',
@@ -110,6 +194,18 @@ class SkipNose(Plugin):
                  'a list of test method names which should be skipped '
                  'under "skip_tests" key.'
         )
+        parser.add_option(
+            '--skipnose-cache',
+            action='store',
+            default=env.get(self.env_cache_opt),
+            dest='skipnose_cache',
+            help='skipnose: path to a json file where digests of passed '
+                 'test modules are stored. Test modules which did not change '
+                 'since they last passed, including their local imports, '
+                 'are skipped. '
+                 '(alternatively, set ${env})'
+                 ''.format(env=self.env_cache_opt)
+        )
 
     def configure(self, options, conf):
         """
@@ -126,10 +222,21 @@ class SkipNose(Plugin):
             self.enabled = True
             self.debug = options.skipnose_debug
             self.skipnose_include = list(map(
-                lambda i: i.split(':'),
+                lambda i: list(map(compile_path_glob, i.split(':'))),
                 options.skipnose_include
             ))
-            self.skipnose_exclude = options.skipnose_exclude
+            self.skipnose_exclude = list(map(
+                compile_path_glob,
+                options.skipnose_exclude
+            ))
+            self.skipnose_test_include = list(map(
+                lambda i: list(map(compile_glob, i.split(':'))),
+                options.skipnose_test_include
+            ))
+            self.skipnose_test_exclude = list(map(
+                compile_glob,
+                options.skipnose_test_exclude
+            ))
 
             if options.skipnose_skip_tests:
                 if not os.path.exists(options.skipnose_skip_tests):
@@ -143,6 +250,55 @@ class SkipNose(Plugin):
                     data = fid.read().decode('utf-8')
                     self.skipnose_skip_tests = json.loads(data)['skip_tests']
 
+            self.skipnose_cache = None
+            self._cached_modules = {}
+            self._loaded_modules = {}
+            self._run_modules = set()
+            self._failed_modules = set()
+            self._skipped_modules = set()
+            # only some tests within the module are executed
+            # when test is addressed as "module:Class.method"
+            self._partial_run = any(map(
+                lambda i: ':' in i,
+                getattr(conf, 'testNames', None) or []
+            ))
+            if options.skipnose_cache:
+                self.skipnose_cache = ResultCache(
+                    options.skipnose_cache,
+                    self._cache_config(conf),
+                    roots=[getattr(conf, 'workingDir', None) or os.getcwd()],
+                )
+                self.skipnose_cache.load()
+
+    def _cache_config(self, conf):
+        """
+        Configuration which affects which tests are executed
+        hence is included in the digest of every cached module
+        """
+        def patterns(values):
+            return [getattr(i, 'pattern', i) for i in values or []]
+
+        test_match = getattr(conf, 'testMatch', None)
+        options = getattr(conf, 'options', None)
+        return {
+            'include': [
+                [j.pattern for j in i] for i in self.skipnose_include
+            ],
+            'exclude': [i.pattern for i in self.skipnose_exclude],
+            'test_include': [
+                [j.pattern for j in i] for i in self.skipnose_test_include
+            ],
+            'test_exclude': [i.pattern for i in self.skipnose_test_exclude],
+            'skip_tests': self.skipnose_skip_tests,
+            'test_match': getattr(test_match, 'pattern', None),
+            'nose_include': patterns(getattr(conf, 'include', None)),
+            'nose_exclude': patterns(getattr(conf, 'exclude', None)),
+            'nose_ignore_files': patterns(getattr(conf, 'ignoreFiles', None)),
+            'nose_attr': getattr(options, 'attr', None),
+            'nose_eval_attr': getattr(options, 'eval_attr', None),
+            'python': sys.version,
+        }
+
     def wantDirectory(self, dirname):
         """
         Nose plugin hook which allows to add logic whether nose
@@ -173,7 +329,6 @@ class SkipNose(Plugin):
             ``None`` is returned for unknown.
         """
         want = True
-        basename = os.path.basename(dirname)
 
         if self.skipnose_include:
             want = all(map(
@@ -182,12 +337,7 @@ class SkipNose(Plugin):
             ))
 
         if self.skipnose_exclude and want is not False:
-            # exclude the folder if the folder path
-            # matches any of the exclude patterns
-            want = not any(map(
-                lambda i: fnmatch.fnmatch(basename, i),
-                self.skipnose_exclude
-            ))
+            want = not self.is_excluded(dirname)
 
         if self.debug:
             if not want:
@@ -198,36 +348,254 @@ class SkipNose(Plugin):
         # normalize boolean to only ``False`` or ``None``
         return False if want is False else None
 
-    @staticmethod
-    def _want_directory_by_includes(dirname, includes):
+    def is_excluded(self, dirname):
+        """
+        Check whether the directory matches any of the exclude patterns
+        """
+        # exclude the folder if the folder path
+        # matches any of the exclude patterns
+        basename = os.path.normcase(os.path.basename(dirname))
+        return any(map(
+            lambda i: i.match(basename),
+            self.skipnose_exclude or []
+        ))
+
+    def clear_subfolders(self):
+        """
+        Forget memoized subfolders of all directories.
+
+        Should be called when directories are added or removed
+        after tests were already collected such as in watch mode.
+        """
+        self._subfolders = {}
+
+    def _want_directory_by_includes(self, dirname, includes):
         # check all subfolders to see if any of them match
         # if yes, then this parent folder should be included
         # so that nose can get to the subfolder
-        subfolders = map(
-            os.path.basename,
-            list(walk_subfolders(dirname)) + [dirname]
+        subfolders = self._get_subfolders(dirname)
+        want = any(
+            pattern.match(name)
+            for pattern in includes
+            for name in subfolders
         )
-        want = any(map(
-            lambda i: fnmatch.filter(subfolders, i),
-            includes
-        ))
 
         # if directory is not wanted then there is a possibility
         # it is a subfolder of a wanted directory so
         # check against parent folder patterns
         if not want:
-            parts = dirname.split(os.sep)
-            want = any(map(
-                lambda i: fnmatch.filter(parts, i),
-                includes
-            ))
+            parts = os.path.normcase(dirname).split(os.sep)
+            want = any(
+                pattern.match(part)
+                for pattern in includes
+                for part in parts
+            )
 
         return want
 
+    def _get_subfolders(self, dirname):
+        """
+        Get basenames of the directory and all of its subfolders.
+
+        Subtree is walked once and basenames of all of its subfolders
+        are memoized as well so that checking any of the subfolders
+        later on does not walk the subtree again.
+        """
+        if dirname in self._subfolders:
+            return self._subfolders[dirname]
+
+        def basename(path):
+            return os.path.normcase(os.path.basename(path))
+
+        names = {dirname: set([basename(dirname)])}
+        for path in walk_subfolders(dirname):
+            # add name to the folder itself and all of its parents
+            current = path
+            while current != dirname and current.startswith(dirname):
+                names.setdefault(current, set([basename(current)]))
+                names[current].add(basename(path))
+                current = os.path.dirname(current)
+            names[dirname].add(basename(path))
+
+        for path, value in names.items():
+            self._subfolders.setdefault(path, value)
+        return self._subfolders[dirname]
+
+    def wantFile(self, file):
+        """
+        Nose plugin hook which allows to add logic whether nose
+        should load tests from the given file.
+
+        When ``skipnose_cache`` is provided, test modules which
+        passed previously and did not change since are not loaded.
+        Instead they are reported as skipped by ``loadTestsFromDir``.
+
+        Parameters
+        ----------
+        file : str
+            File path to consider
+
+        Returns
+        -------
+        want : bool, None
+            ``False`` if file should be skipped and ``None`` for unknown.
+        """
+        if self.skipnose_cache is None:
+            return None
+        if not file.endswith('.py') or os.path.basename(file) == '__init__.py':
+            return None
+
+        path = os.path.abspath(file)
+        if not self.skipnose_cache.is_passed(path):
+            # digest of the module as it is loaded is recorded
+            # so that changes during the test run are not missed
+            self._loaded_modules[path] = self.skipnose_cache.digest(path)
+            return None
+
+        if self.debug:
+            print('Skipnose: Cached   {}'.format(path), file=sys.stderr)
+
+        self._cached_modules.setdefault(
+            os.path.dirname(path), []
+        ).append(path)
+        return False
+
+    def loadTestsFromDir(self, path):
+        """
+        Report test modules within the directory which were not
+        loaded because of a cached pass as skipped
+        """
+        cached = self._cached_modules.pop(os.path.abspath(path), [])
+        if not cached:
+            return None
+
+        return [
+            Failure(
+                SkipTest,
+                'cached pass: {} did not change since it last passed'
+                ''.format(i),
+                address=(i, getpackage(i), None),
+            )
+            for i in cached
+        ]
+
+    def wantClass(self, cls):
+        """
+        Nose plugin hook which allows to add logic whether nose
+        should collect tests from the given class.
+
+        Class is included when its dotted name or dotted name of
+        any of its attributes matches include patterns so that nose
+        can get to the methods which are included.
+
+        Parameters
+        ----------
+        cls : type
+            Class to consider
+
+        Returns
+        -------
+        want : bool, None
+            ``False`` if class should be skipped and ``None`` for unknown.
+        """
+        test_name = '{}.{}'.format(cls.__module__, cls.__name__)
+        related = []
+        if self.skipnose_test_include:
+            related = list(map(
+                lambda i: '{}.{}'.format(test_name, i),
+                dir(cls)
+            ))
+        return self._want_test(test_name, related)
+
+    def wantMethod(self, method):
+        """
+        Nose plugin hook which allows to add logic whether nose
+        should collect the given test method.
+
+        Method is included when either its dotted name or dotted name
+        of its class matches include patterns.
+
+        Parameters
+        ----------
+        method : method
+            Method to consider
+
+        Returns
+        -------
+        want : bool, None
+            ``False`` if method should be skipped and ``None`` for unknown.
+        """
+        cls = get_method_class(method)
+        name = getattr(method, '__name__', None)
+        if cls is None or name is None:
+            return None
+
+        class_name = '{}.{}'.format(cls.__module__, cls.__name__)
+        test_name = '{}.{}'.format(class_name, name)
+        return self._want_test(test_name, [class_name])
+
+    def wantFunction(self, function):
+        """
+        Nose plugin hook which allows to add logic whether nose
+        should collect the given test function.
+
+        Parameters
+        ----------
+        function : function
+            Function to consider
+
+        Returns
+        -------
+        want : bool, None
+            ``False`` if function should be skipped and ``None`` for unknown.
+        """
+        test_name = '{}.{}'.format(function.__module__, function.__name__)
+        return self._want_test(test_name, [])
+
+    def _want_test(self, test_name, related):
+        """
+        Determine whether test should be collected by its dotted name.
+
+        ``related`` are the names of parent or child tests which
+        when included, make the test included as well.
+        """
+        want = True
+
+        if self.skipnose_test_include:
+            names = [test_name] + related
+            want = all(map(
+                lambda clause: any(
+                    pattern.match(name)
+                    for pattern in clause
+                    for name in names
+                ),
+                self.skipnose_test_include
+            ))
+
+        if self.skipnose_test_exclude and want:
+            want = not any(map(
+                lambda i: i.match(test_name),
+                self.skipnose_test_exclude
+            ))
+
+        if self.debug:
+            if not want:
+                print('Skipnose: Skipping {}'.format(test_name),
+                      file=sys.stderr)
+            else:
+                print('Skipnose:          {}'.format(test_name),
+                      file=sys.stderr)
+
+        # normalize boolean to only ``False`` or ``None``
+        return False if want is False else None
+
     def startTest(self, test):
         """
         Skip tests when skipnose_skip_tests is provided
         """
+        if self.skipnose_cache is not None:
+            self._run_modules.add(self._get_test_file(test))
+
         if not self.skipnose_skip_tests:
             return
 
@@ -252,3 +620,74 @@ class SkipNose(Plugin):
                 )
 
             setattr(test.test, test.test._testMethodName, skip_test)
+
+    def addError(self, test, err):
+        """
+        Mark test module as failed unless error is a skipped test
+        in which case test module is marked as skipped
+        """
+        if inspect.isclass(err[0]) and issubclass(err[0], SkipTest):
+            if self.skipnose_cache is not None:
+                path = self._get_test_file(test)
+                # cached passes are reported as skipped however
+                # they were never loaded hence are not marked
+                if path in self._loaded_modules:
+                    self._skipped_modules.add(path)
+            return
+        self.addFailure(test, err)
+
+    def addFailure(self, test, err):
+        """
+        Mark test module as failed
+        """
+        if self.skipnose_cache is not None:
+            self._failed_modules.add(self._get_test_file(test))
+
+    def finalize(self, result):
+        """
+        Record outcomes of all executed test modules in skipnose_cache
+
+        Passes are only recorded for modules which were discovered
+        within directories since explicitly addressed modules or tests
+        might only run some of the tests within the module.
+        Passes are not recorded either when a failure cannot be
+        attributed to a specific test module or for modules with
+        skipped tests since skips usually depend on the environment.
+        """
+        if self.skipnose_cache is None:
+            return
+
+        record_passes = (
+            not self._partial_run and
+            None not in self._failed_modules
+        )
+        for path in self._run_modules - set([None]):
+            if path in self._failed_modules:
+                self.skipnose_cache.record_failure(path)
+            elif (record_passes and
+                    path in self._loaded_modules and
+                    path not in self._skipped_modules):
+                self.skipnose_cache.record_pass(
+                    path, self._loaded_modules[path]
+                )
+
+        self.skipnose_cache.save()
+
+    @staticmethod
+    def _get_test_file(test):
+        """
+        Get absolute path of the module the test or suite belongs to
+        """
+        address = getattr(test, 'address', None)
+        address = address() if callable(address) else None
+        filename = address[0] if address else None
+
+        if not filename:
+            context = getattr(test, 'context', None)
+            if inspect.isclass(context):
+                context = sys.modules.get(context.__module__)
+            filename = getattr(context, '__file__', None)
+
+        if not filename:
+            return None
+        return os.path.abspath(src(filename))
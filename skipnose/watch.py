@@ -0,0 +1,572 @@
+from __future__ import print_function, unicode_literals
+import os
+import sys
+import time
+
+from nose.config import Config, all_config_files
+from nose.core import TestProgram
+from nose.plugins.manager import DefaultPluginManager, PluginManager
+from nose.util import split_test_name
+
+from .cache import find_imports, find_package_root, resolve_module
+from .skipnose import SkipNose
+
+
+class DirectoryIndex(object):
+    """
+    In-memory index of Python source files within watched directories
+
+    Index is built once by walking the roots and afterwards
+    is kept up to date by polling ``os.stat`` of known directories
+    and files so no filesystem notification dependency is required.
+    Only directories which are not excluded by skipnose exclude
+    patterns are indexed. Include patterns are not applied since
+    sources outside of included directories can still be imported
+    by the included tests.
+
+    Attributes
+    ----------
+    plugin : SkipNose
+        Configured skipnose plugin used to exclude directories
+    roots : list
+        List of root directories to watch
+    dirs : dict
+        Mapping of indexed directory paths to their mtime
+    files : dict
+        Mapping of indexed file paths to their ``(mtime, size)``
+    ignored : set
+        Directory paths which are not wanted hence not indexed
+    """
+
+    def __init__(self, plugin, roots):
+        self.plugin = plugin
+        self.roots = roots
+        self.dirs = {}
+        self.files = {}
+        self.ignored = set()
+
+    def build(self):
+        """
+        Walk all roots and index all wanted directories and files
+        """
+        self.dirs = {}
+        self.files = {}
+        self.ignored = set()
+        for root in self.roots:
+            self._index_tree(root)
+
+    def poll(self):
+        """
+        Poll the index for any changes since last poll
+
+        Changes in directories mtime trigger the directory to be
+        re-listed hence new files and subdirectories are discovered
+        without walking the whole tree.
+
+        Returns
+        -------
+        changed : list
+            Sorted list of added, modified or removed file paths
+        """
+        changed = set()
+
+        for dirpath, mtime in list(self.dirs.items()):
+            if dirpath not in self.dirs:
+                # already removed as part of parent directory removal
+                continue
+            stat = self._stat(dirpath)
+            if stat is None:
+                changed.update(self._remove_tree(dirpath))
+            elif stat.st_mtime != mtime:
+                changed.update(self._index_directory(dirpath, stat))
+
+        for path, signature in list(self.files.items()):
+            stat = self._stat(path)
+            if stat is None:
+                del self.files[path]
+                changed.add(path)
+            elif (stat.st_mtime, stat.st_size) != signature:
+                self.files[path] = (stat.st_mtime, stat.st_size)
+                changed.add(path)
+
+        return sorted(changed)
+
+    def _index_tree(self, root):
+        added = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            wanted = []
+            for dirname in dirnames:
+                path = os.path.join(dirpath, dirname)
+                if self._want_directory(path):
+                    wanted.append(dirname)
+                else:
+                    self.ignored.add(path)
+            dirnames[:] = wanted
+            stat = self._stat(dirpath)
+            if stat is None:
+                continue
+            self.dirs[dirpath] = stat.st_mtime
+            added.extend(self._index_files(dirpath, filenames))
+        return added
+
+    def _index_directory(self, dirpath, stat):
+        """
+        Re-list a single directory and return files which were
+        either added or removed from it
+        """
+        self.dirs[dirpath] = stat.st_mtime
+        try:
+            names = os.listdir(dirpath)
+        except OSError:
+            return self._remove_tree(dirpath)
+
+        changed = []
+        filenames = []
+        dirnames = []
+        for name in names:
+            path = os.path.join(dirpath, name)
+            if os.path.isdir(path):
+                dirnames.append(path)
+            else:
+                filenames.append(name)
+
+        new_dirnames = [
+            i for i in dirnames
+            if i not in self.dirs and i not in self.ignored
+        ]
+        if new_dirnames:
+            # memoized subtrees of parent directories are stale now
+            self.plugin.clear_subfolders()
+        for path in new_dirnames:
+            if self._want_directory(path):
+                changed.extend(self._index_tree(path))
+            else:
+                self.ignored.add(path)
+
+        changed.extend(self._index_files(dirpath, filenames))
+
+        existing = set(os.path.join(dirpath, i) for i in names)
+        for path in list(self.files):
+            if os.path.dirname(path) == dirpath and path not in existing:
+                del self.files[path]
+                changed.append(path)
+        for path in list(self.dirs):
+            if os.path.dirname(path) == dirpath and path not in existing:
+                changed.extend(self._remove_tree(path))
+        for path in list(self.ignored):
+            if os.path.dirname(path) == dirpath and path not in existing:
+                self.ignored.discard(path)
+                self.plugin.clear_subfolders()
+
+        return changed
+
+    def _index_files(self, dirpath, filenames):
+        added = []
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            if path in self.files:
+                continue
+            stat = self._stat(path)
+            if stat is None:
+                continue
+            self.files[path] = (stat.st_mtime, stat.st_size)
+            added.append(path)
+        return added
+
+    def _remove_tree(self, dirpath):
+        self.plugin.clear_subfolders()
+        prefix = dirpath + os.sep
+        removed = []
+        for path in list(self.dirs):
+            if path == dirpath or path.startswith(prefix):
+                del self.dirs[path]
+        for path in list(self.files):
+            if path.startswith(prefix):
+                del self.files[path]
+                removed.append(path)
+        self.ignored = set(
+            i for i in self.ignored if not i.startswith(prefix)
+        )
+        return removed
+
+    def _want_directory(self, dirpath):
+        basename = os.path.basename(dirpath)
+        if basename.startswith('.') or basename in ('__pycache__',
+                                                    'site-packages'):
+            return False
+        # virtualenvs are not part of the project sources
+        if os.path.exists(os.path.join(dirpath, 'pyvenv.cfg')):
+            return False
+        return not self.plugin.is_excluded(dirpath)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+
+class WatchTestProgram(TestProgram):
+    """
+    Nose test program which runs only the given targets
+    instead of test names parsed from the command line arguments
+    """
+
+    def __init__(self, targets=None, **kwargs):
+        self.targets = targets
+        super(WatchTestProgram, self).__init__(**kwargs)
+
+    def createTests(self):
+        if self.targets:
+            self.testNames = self.targets
+        super(WatchTestProgram, self).createTests()
+
+
+class Watcher(object):
+    """
+    Keeps nose plugins and directory index in memory and reruns
+    tests affected by changed files
+
+    Attributes
+    ----------
+    argv : list
+        nosetests arguments used for every test run
+    plugin : SkipNose
+        skipnose plugin instance shared by all test runs
+    plugins : list
+        All nose plugin instances shared by all test runs
+    config : Config
+        nose configuration as parsed from ``argv``
+    working_dir : str
+        Directory from which tests are executed
+    test_roots : list
+        Directories in which tests are collected
+    test_files : set
+        Test modules which are explicitly given as test names
+    source_roots : list
+        Directories from which local modules are imported
+    index : DirectoryIndex
+        Index of watched directories
+    imports : dict
+        Mapping of indexed file paths to local files they import
+    modules : set
+        Names of modules imported before any test run
+    """
+
+    def __init__(self, argv):
+        self.argv = ['nosetests', '--with-skipnose'] + list(argv)
+        self.plugin = SkipNose()
+
+        manager = DefaultPluginManager()
+        manager.addPlugins(extraplugins=[self.plugin])
+        manager.loadPlugins()
+        self.plugins = list(manager.plugins)
+
+        self.config = self._make_config()
+        self.config.configure(self.argv)
+
+        self.working_dir = os.path.abspath(
+            self.config.workingDir or os.getcwd()
+        )
+        self.source_roots = self._source_roots()
+        self.test_roots, self.test_files = self._test_targets()
+        self.index = DirectoryIndex(
+            self.plugin,
+            [self.working_dir] + sorted(set(
+                i for i in self.test_roots + [
+                    os.path.dirname(j) for j in self.test_files
+                ]
+                if not self._is_within(i, [self.working_dir])
+            )),
+        )
+        self.imports = {}
+        self.modules = set(sys.modules)
+
+    def _make_config(self):
+        # plain manager does not load plugins again from entry points
+        # hence the same plugin instances are reused by every run
+        return Config(
+            env=os.environ,
+            files=all_config_files(),
+            plugins=PluginManager(plugins=self.plugins),
+        )
+
+    def _test_targets(self):
+        """
+        Split test names into directories and test module files
+        so that only the given tests are ever rerun
+        """
+        if not self.config.testNames:
+            return [self.working_dir], set()
+
+        roots = []
+        files = set()
+        for name in self.config.testNames:
+            filename, module, _ = split_test_name(name)
+            if filename:
+                path = os.path.abspath(
+                    os.path.join(self.working_dir, filename)
+                )
+            else:
+                resolved = resolve_module(self.source_roots, module)
+                if not resolved:
+                    continue
+                path = resolved[-1]
+                if os.path.basename(path) == '__init__.py':
+                    path = os.path.dirname(path)
+
+            if os.path.isdir(path):
+                roots.append(path)
+            elif os.path.isfile(path):
+                files.add(path)
+        return roots, files
+
+    def _source_roots(self):
+        # sys.path entries within the project such as "src" layouts
+        roots = [self.working_dir]
+        for path in sys.path:
+            path = os.path.abspath(path or os.curdir)
+            if (path not in roots and os.path.isdir(path) and
+                    self._is_within(path, [self.working_dir])):
+                roots.append(path)
+        return roots
+
+    @staticmethod
+    def _is_within(path, roots):
+        return any(
+            path == i or path.startswith(i.rstrip(os.sep) + os.sep)
+            for i in roots
+        )
+
+    def update_imports(self, paths):
+        """
+        Update which local files are imported by the given files
+        """
+        for path in paths:
+            try:
+                with open(path, 'rb') as fid:
+                    source = fid.read()
+            except (IOError, OSError):
+                self.imports.pop(path, None)
+                continue
+            self.imports[path] = find_imports(
+                path, source, [find_package_root(path)] + self.source_roots
+            )
+
+    def is_test_module(self, path):
+        """
+        Check whether the file is a test module nose would collect
+        """
+        if path in self.test_files:
+            return True
+        basename = os.path.basename(path)
+        module = os.path.splitext(basename)[0]
+        return (
+            basename != '__init__.py' and
+            bool(self.config.testMatch.search(module)) and
+            self._is_within(path, self.test_roots) and
+            self.plugin.wantDirectory(os.path.dirname(path)) is not False
+        )
+
+    def importers(self, path):
+        """
+        Find all test modules which import the file, even transitively
+        """
+        reverse = {}
+        for module, imports in self.imports.items():
+            for i in imports:
+                reverse.setdefault(i, []).append(module)
+
+        found = set()
+        seen = set([path])
+        pending = [path]
+        while pending:
+            for module in reverse.get(pending.pop(), []):
+                if module in seen:
+                    continue
+                seen.add(module)
+                pending.append(module)
+                if self.is_test_module(module) and os.path.exists(module):
+                    found.add(module)
+        return found
+
+    def affected(self, changed):
+        """
+        Determine which test targets should be rerun for changed files
+
+        Changed test modules are rerun by themselves. Any other changed
+        file reruns all test modules which import it. When no test module
+        imports it, the directory containing it is rerun when it is
+        within test directories or otherwise all tests are rerun.
+
+        Parameters
+        ----------
+        changed : list
+            List of changed file paths
+
+        Returns
+        -------
+        targets : list, None
+            Sorted list of paths to rerun or ``None`` when all tests
+            as given in ``argv`` should be rerun
+        """
+        targets = set()
+        for path in changed:
+            if self.is_test_module(path):
+                if os.path.exists(path):
+                    targets.add(path)
+                continue
+
+            importers = self.importers(path)
+            dirname = os.path.dirname(path)
+            if importers:
+                targets.update(importers)
+            elif self._is_within(path, self.test_roots):
+                if (os.path.isdir(dirname) and
+                        self.plugin.wantDirectory(dirname) is not False):
+                    targets.add(dirname)
+            else:
+                return None
+
+        # nested targets are already covered by their parent directory
+        return sorted(
+            i for i in targets
+            if not any(
+                i.startswith(j + os.sep) for j in targets if j != i
+            )
+        )
+
+    def run(self, targets=None):
+        """
+        Run tests in the current process
+
+        All local modules imported by a previous run are first removed
+        from ``sys.modules`` so that changed code is imported again.
+        Other modules such as installed packages stay imported.
+
+        Parameters
+        ----------
+        targets : list, None
+            Paths to run. ``None`` runs tests as given in ``argv``.
+
+        Returns
+        -------
+        success : bool
+            Whether all tests passed
+        """
+        for name, module in list(sys.modules.items()):
+            filename = getattr(module, '__file__', None)
+            if name in self.modules or not filename:
+                continue
+            filename = os.path.abspath(filename)
+            if ('site-packages' not in filename.split(os.sep) and
+                    self._is_within(filename, self.index.roots)):
+                del sys.modules[name]
+
+        program = WatchTestProgram(
+            targets=targets,
+            argv=self.argv,
+            config=self._make_config(),
+            exit=False,
+        )
+        return program.success
+
+    def watch(self, interval):
+        """
+        Run all tests and then rerun affected tests whenever
+        any files within the index change
+        """
+        self.index.build()
+        self.update_imports(self.index.files)
+        self.run()
+
+        while True:
+            time.sleep(interval)
+            changed = self.index.poll()
+            if not changed:
+                continue
+
+            targets = self.affected(changed)
+            self.update_imports(changed)
+            if targets is None:
+                print('Skipnose: Rerunning all tests', file=sys.stderr)
+                self.run()
+                continue
+            if not targets:
+                continue
+
+            print(
+                'Skipnose: Rerunning {}'.format(' '.join(targets)),
+                file=sys.stderr
+            )
+            self.run(targets)
+
+
+USAGE = 'usage: python -m skipnose watch [--watch-interval SECONDS] ' \
+        '[nosetests args]'
+
+
+def parse_args(argv):
+    """
+    Split command line arguments into watch interval and nosetests arguments
+
+    ``watch`` command can be given anywhere within the arguments
+    and only exact ``--watch-interval`` option is recognized
+    so that all other options are passed to nosetests as is.
+
+    Raises
+    ------
+    ValueError
+        When ``watch`` command is missing or interval is not
+        a positive number
+    """
+    argv = list(argv)
+    if 'watch' not in argv:
+        raise ValueError('missing "watch" command')
+    argv.remove('watch')
+
+    interval = 0.5
+    nose_argv = []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--watch-interval':
+            value = next(args, None)
+        elif arg.startswith('--watch-interval='):
+            value = arg.split('=', 1)[1]
+        else:
+            nose_argv.append(arg)
+            continue
+
+        try:
+            interval = float(value)
+        except (TypeError, ValueError):
+            interval = None
+        if interval is None or not interval > 0:
+            raise ValueError(
+                'invalid --watch-interval value: {!r}'.format(value)
+            )
+
+    return interval, nose_argv
+
+
+def main(argv=None):
+    """
+    Entry point for ``python -m skipnose watch``
+    """
+    try:
+        interval, nose_argv = parse_args(
+            sys.argv[1:] if argv is None else argv
+        )
+    except ValueError as e:
+        print(USAGE, file=sys.stderr)
+        print('error: {}'.format(e), file=sys.stderr)
+        return 2
+
+    watcher = Watcher(nose_argv)
+    try:
+        watcher.watch(interval)
+    except KeyboardInterrupt:
+        return 0
@@ -0,0 +1,237 @@
+from __future__ import print_function, unicode_literals
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import mock
+
+from skipnose.cache import (
+    ResultCache,
+    find_imports,
+    find_package_root,
+    resolve_module,
+)
+
+
+class CacheTestCase(TestCase):
+    """
+    Base test class which creates a temporary package tree
+    """
+
+    def setUp(self):
+        super(CacheTestCase, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self._write('pkg/__init__.py')
+        self._write('pkg/sub/__init__.py')
+        self._write('pkg/sub/helpers.py', 'VALUE = 1\n')
+        self._write('pkg/utils.py')
+        self._write(
+            'pkg/test_foo.py',
+            'import os\n'
+            'import pkg.utils\n'
+            'from .sub import helpers\n'
+        )
+
+    def tearDown(self):
+        super(CacheTestCase, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _path(self, path):
+        return os.path.join(self.root, *path.split('/'))
+
+    def _write(self, path, content=''):
+        path = self._path(path)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fid:
+            fid.write(content)
+        return path
+
+
+class TestImports(CacheTestCase):
+    """
+    Test class for resolving local imports
+    """
+
+    def test_find_package_root(self):
+        """
+        Test that find_package_root returns directory above top package
+        """
+        self.assertEqual(
+            find_package_root(self._path('pkg/sub/helpers.py')),
+            self.root
+        )
+
+    def test_resolve_module(self):
+        """
+        Test that resolve_module includes parent packages
+        """
+        self.assertListEqual(
+            resolve_module([self.root], 'pkg.sub.helpers'),
+            [
+                self._path('pkg/__init__.py'),
+                self._path('pkg/sub/__init__.py'),
+                self._path('pkg/sub/helpers.py'),
+            ]
+        )
+
+    def test_resolve_module_not_local(self):
+        """
+        Test that resolve_module ignores modules outside of roots
+        """
+        self.assertListEqual(resolve_module([self.root], 'os.path'), [])
+
+    def test_find_imports(self):
+        """
+        Test that find_imports resolves both absolute and relative imports
+        """
+        path = self._path('pkg/test_foo.py')
+        with open(path, 'rb') as fid:
+            source = fid.read()
+
+        self.assertListEqual(
+            find_imports(path, source, [self.root]),
+            sorted([
+                self._path('pkg/__init__.py'),
+                self._path('pkg/utils.py'),
+                self._path('pkg/sub/__init__.py'),
+                self._path('pkg/sub/helpers.py'),
+            ])
+        )
+
+    def test_find_imports_syntax_error(self):
+        """
+        Test that find_imports ignores modules with invalid syntax
+        """
+        self.assertListEqual(find_imports('foo.py', b'def (', []), [])
+
+
+class TestResultCache(CacheTestCase):
+    """
+    Test class for result cache
+    """
+
+    def setUp(self):
+        super(TestResultCache, self).setUp()
+        self.path = self._path('pkg/test_foo.py')
+        self.cache = ResultCache(
+            self._path('cache.json'), {'foo': 'bar'}, roots=[self.root]
+        )
+
+    def _new_cache(self, config=None):
+        cache = ResultCache(
+            self._path('cache.json'),
+            config or {'foo': 'bar'},
+            roots=[self.root],
+        )
+        cache.load()
+        return cache
+
+    def test_record(self):
+        """
+        Test that recorded pass is remembered until module fails
+        """
+        self.assertFalse(self.cache.is_passed(self.path))
+
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.assertTrue(self.cache.is_passed(self.path))
+
+        self.cache.record_failure(self.path)
+        self.assertFalse(self.cache.is_passed(self.path))
+
+    def test_save_load(self):
+        """
+        Test that recorded passes are persisted in json file
+        """
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+
+        self.assertTrue(self._new_cache().is_passed(self.path))
+
+    def test_save_replaces_file(self):
+        """
+        Test that save replaces cache file without leaving
+        temporary files behind
+        """
+        self._write('cache.json', 'old')
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+
+        self.assertTrue(self._new_cache().is_passed(self.path))
+        self.assertListEqual(
+            sorted(os.listdir(self.root)), ['cache.json', 'pkg']
+        )
+
+    def test_load_invalid(self):
+        """
+        Test that invalid cache file is ignored with a warning
+        """
+        self._write('cache.json', '{')
+
+        with mock.patch('skipnose.cache.print', create=True) as mock_print:
+            cache = self._new_cache()
+
+        self.assertTrue(mock_print.called)
+        self.assertDictEqual(cache.files, {})
+        self.assertDictEqual(cache.modules, {})
+        self.assertFalse(cache.is_passed(self.path))
+
+    def test_config_changed(self):
+        """
+        Test that changed configuration invalidates cached pass
+        """
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+
+        self.assertFalse(
+            self._new_cache({'foo': 'baz'}).is_passed(self.path)
+        )
+
+    def test_import_changed(self):
+        """
+        Test that changes in transitive imports invalidate cached pass
+        """
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+
+        self._write('pkg/sub/helpers.py', 'VALUE = 2\n')
+
+        self.assertFalse(self._new_cache().is_passed(self.path))
+
+    def test_import_removed(self):
+        """
+        Test that removed import invalidates cached pass
+        """
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+
+        os.remove(self._path('pkg/utils.py'))
+
+        self.assertFalse(self._new_cache().is_passed(self.path))
+
+    def test_record_pass_digest(self):
+        """
+        Test that record_pass stores the given digest even when
+        module changed since
+        """
+        digest = self.cache.digest(self.path)
+        self._write('pkg/test_foo.py', 'changed')
+
+        self.cache.record_pass(self.path, digest)
+        self.cache.save()
+
+        self.assertFalse(self._new_cache().is_passed(self.path))
+
+    def test_unchanged_files_not_read(self):
+        """
+        Test that unchanged files are not read again
+        """
+        self.cache.record_pass(self.path, self.cache.digest(self.path))
+        self.cache.save()
+        cache = self._new_cache()
+
+        with mock.patch('skipnose.cache.open', create=True) as mock_open:
+            self.assertTrue(cache.is_passed(self.path))
+
+        self.assertFalse(mock_open.called)
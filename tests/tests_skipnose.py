@@ -1,11 +1,19 @@
 from __future__ import print_function, unicode_literals
+import fnmatch
+import re
 from unittest import TestCase
 
 import mock
 from nose.case import FunctionTestCase
 from nose.plugins.skip import SkipTest
 
-from skipnose.skipnose import SkipNose, walk_subfolders
+from skipnose.skipnose import (
+    SkipNose,
+    compile_glob,
+    compile_path_glob,
+    get_method_class,
+    walk_subfolders,
+)
 
 
 class TestWalkSubfolders(TestCase):
@@ -32,6 +40,35 @@ class TestWalkSubfolders(TestCase):
         mock_walk.assert_called_once_with('foo')
 
 
+class TestGetMethodClass(TestCase):
+    """
+    Test class for resolving classes of nose test methods
+    """
+
+    def test_get_method_class_im_class(self):
+        """
+        Test that get_method_class returns im_class of Python 2 methods
+        """
+        method = mock.MagicMock(im_class=mock.sentinel.cls)
+
+        self.assertIs(get_method_class(method), mock.sentinel.cls)
+
+    def test_get_method_class_unbound_method(self):
+        """
+        Test that get_method_class returns class of nose UnboundMethod
+        """
+        method = mock.MagicMock(spec=['__self__'])
+        method.__self__.cls = mock.sentinel.cls
+
+        self.assertIs(get_method_class(method), mock.sentinel.cls)
+
+    def test_get_method_class_none(self):
+        """
+        Test that get_method_class returns None for non-methods
+        """
+        self.assertIsNone(get_method_class(mock.MagicMock(spec=[])))
+
+
 @mock.patch('skipnose.skipnose.print', mock.MagicMock(), create=True)
 class TestSkipNoseConfig(TestCase):
     """
@@ -50,6 +87,8 @@ class TestSkipNoseConfig(TestCase):
         env = {
             'NOSE_SKIPNOSE_INCLUDE': 'including',
             'NOSE_SKIPNOSE_EXCLUDE': 'excluding',
+            'NOSE_SKIPNOSE_TEST_INCLUDE': 'a.b,c:d',
+            'NOSE_SKIPNOSE_TEST_EXCLUDE': 'e;f:g',
             'NOSE_SKIPNOSE': 'on',
         }
         mock_parser = mock.MagicMock()
@@ -78,6 +117,16 @@ class TestSkipNoseConfig(TestCase):
                           default=['excluding'],
                           dest=mock.ANY,
                           help=mock.ANY),
+                mock.call('--skipnose-test-include',
+                          action='append',
+                          default=['a.b', 'c:d'],
+                          dest=mock.ANY,
+                          help=mock.ANY),
+                mock.call('--skipnose-test-exclude',
+                          action='append',
+                          default=['e', 'f', 'g'],
+                          dest=mock.ANY,
+                          help=mock.ANY),
             ]
         )
 
@@ -91,7 +140,10 @@ class TestSkipNoseConfig(TestCase):
             skipnose_debug=mock.sentinel.debug,
             skipnose_include=['a', 'b:c'],
             skipnose_exclude=['x', 'y'],
+            skipnose_test_include=['*.Foo', '*Bar*:*Baz*'],
+            skipnose_test_exclude=['*_slow'],
             skipnose_skip_tests='foo.json',
+            skipnose_cache=None,
         )
         mock_path_exists.return_value = True
         mock_open = mock.MagicMock()
@@ -105,11 +157,78 @@ class TestSkipNoseConfig(TestCase):
 
         self.assertTrue(self.plugin.enabled)
         self.assertEqual(self.plugin.debug, mock.sentinel.debug)
-        self.assertEqual(self.plugin.skipnose_include, [['a'], ['b', 'c']])
-        self.assertEqual(self.plugin.skipnose_exclude, ['x', 'y'])
+        self.assertEqual(
+            [[j.pattern for j in i] for i in self.plugin.skipnose_include],
+            [[fnmatch.translate('a')],
+             [fnmatch.translate('b'), fnmatch.translate('c')]]
+        )
+        self.assertEqual(
+            [i.pattern for i in self.plugin.skipnose_exclude],
+            [fnmatch.translate('x'), fnmatch.translate('y')]
+        )
+        self.assertEqual(
+            [[j.pattern for j in i]
+             for i in self.plugin.skipnose_test_include],
+            [[fnmatch.translate('*.Foo')],
+             [fnmatch.translate('*Bar*'), fnmatch.translate('*Baz*')]]
+        )
+        self.assertEqual(
+            [i.pattern for i in self.plugin.skipnose_test_exclude],
+            [fnmatch.translate('*_slow')]
+        )
         self.assertEqual(self.plugin.skipnose_skip_tests, ['one', 'two'])
+        self.assertIsNone(self.plugin.skipnose_cache)
         mock_open.assert_called_once_with('foo.json', 'rb')
 
+    @mock.patch('skipnose.skipnose.ResultCache')
+    def test_configure_cache(self, mock_result_cache):
+        """
+        Test that configure loads result cache
+        """
+        mock_options = mock.MagicMock(
+            skipnose_debug=False,
+            skipnose_include=['a'],
+            skipnose_exclude=['x'],
+            skipnose_test_include=['*.Foo'],
+            skipnose_test_exclude=['*_slow'],
+            skipnose_skip_tests=None,
+            skipnose_cache='cache.json',
+        )
+        mock_conf = mock.MagicMock(
+            workingDir='/foo',
+            include=[re.compile('inc')],
+            exclude=[re.compile('exc')],
+            ignoreFiles=[],
+            testNames=[],
+        )
+        mock_conf.testMatch.pattern = 'test'
+        mock_conf.options.attr = ['slow']
+        mock_conf.options.eval_attr = None
+
+        self.plugin.configure(mock_options, mock_conf)
+
+        self.assertEqual(
+            self.plugin.skipnose_cache,
+            mock_result_cache.return_value
+        )
+        mock_result_cache.assert_called_once_with(
+            'cache.json', mock.ANY, roots=['/foo']
+        )
+        config = mock_result_cache.call_args[0][1]
+        self.assertEqual(config['include'], [[fnmatch.translate('a')]])
+        self.assertEqual(config['exclude'], [fnmatch.translate('x')])
+        self.assertEqual(
+            config['test_include'], [[fnmatch.translate('*.Foo')]]
+        )
+        self.assertEqual(
+            config['test_exclude'], [fnmatch.translate('*_slow')]
+        )
+        self.assertEqual(config['test_match'], 'test')
+        self.assertEqual(config['nose_include'], ['inc'])
+        self.assertEqual(config['nose_exclude'], ['exc'])
+        self.assertEqual(config['nose_attr'], ['slow'])
+        mock_result_cache.return_value.load.assert_called_once_with()
+
     @mock.patch('sys.exit')
     @mock.patch('os.path.exists')
     def test_configure_error(self, mock_path_exists, mock_sys_exit):
@@ -122,6 +241,7 @@ class TestSkipNoseConfig(TestCase):
             skipnose_include=['a', 'b:c'],
             skipnose_exclude=['x', 'y'],
             skipnose_skip_tests='foo.data',
+            skipnose_cache=None,
         )
         mock_path_exists.return_value = False
         mock_open = mock.MagicMock()
@@ -133,8 +253,15 @@ class TestSkipNoseConfig(TestCase):
 
         self.assertTrue(self.plugin.enabled)
         self.assertEqual(self.plugin.debug, mock.sentinel.debug)
-        self.assertEqual(self.plugin.skipnose_include, [['a'], ['b', 'c']])
-        self.assertEqual(self.plugin.skipnose_exclude, ['x', 'y'])
+        self.assertEqual(
+            [[j.pattern for j in i] for i in self.plugin.skipnose_include],
+            [[fnmatch.translate('a')],
+             [fnmatch.translate('b'), fnmatch.translate('c')]]
+        )
+        self.assertEqual(
+            [i.pattern for i in self.plugin.skipnose_exclude],
+            [fnmatch.translate('x'), fnmatch.translate('y')]
+        )
         self.assertIsNone(self.plugin.skipnose_skip_tests)
         self.assertFalse(mock_open.called)
         mock_sys_exit.assert_called_once_with(1)
@@ -217,7 +344,7 @@ class TestSkipNose(TestCase):
             '/test/foo/api/subsubapi/toomuchapi',
         ]
 
-        self.plugin.skipnose_include = [['api']]
+        self.plugin.skipnose_include = [[compile_path_glob('api')]]
         self._test_paths(valid)
 
     @mock.patch('skipnose.skipnose.walk_subfolders')
@@ -248,7 +375,9 @@ class TestSkipNose(TestCase):
             '/test/foo/nonapi/foldertwo/toomuch',
         ]
 
-        self.plugin.skipnose_include = [['api', 'foo']]
+        self.plugin.skipnose_include = [
+            [compile_path_glob('api'), compile_path_glob('foo')],
+        ]
         self._test_paths(valid)
 
     @mock.patch('skipnose.skipnose.walk_subfolders')
@@ -268,9 +397,48 @@ class TestSkipNose(TestCase):
             '/test/foo/api/subsubapi/toomuchapi',
         ]
 
-        self.plugin.skipnose_include = [['api'], ['foo']]
+        self.plugin.skipnose_include = [
+            [compile_path_glob('api')],
+            [compile_path_glob('foo')],
+        ]
         self._test_paths(valid)
 
+    @mock.patch('skipnose.skipnose.walk_subfolders')
+    def test_want_directory_include_walks_once(self, mock_walk_subfolders):
+        """
+        Test wantDirectory memoizes subfolders of the whole walked subtree
+        """
+        mock_walk_subfolders.side_effect = self._mock_walk_subfolders
+        self.plugin.skipnose_include = [[compile_path_glob('api')]]
+
+        for path in self.test_paths:
+            self.plugin.wantDirectory(path)
+
+        mock_walk_subfolders.assert_called_once_with('/test')
+
+    @mock.patch('skipnose.skipnose.walk_subfolders')
+    def test_clear_subfolders(self, mock_walk_subfolders):
+        """
+        Test that clear_subfolders makes wantDirectory walk subtree again
+        """
+        mock_walk_subfolders.side_effect = self._mock_walk_subfolders
+        self.plugin.skipnose_include = [[compile_path_glob('api')]]
+
+        self.plugin.wantDirectory('/test/foo')
+        self.plugin.clear_subfolders()
+        self.plugin.wantDirectory('/test/foo')
+
+        self.assertEqual(mock_walk_subfolders.call_count, 2)
+
+    def test_is_excluded(self):
+        """
+        Test is_excluded matches only directory basename
+        """
+        self.plugin.skipnose_exclude = [compile_path_glob('api')]
+
+        self.assertTrue(self.plugin.is_excluded('/test/foo/api'))
+        self.assertFalse(self.plugin.is_excluded('/test/api/foo'))
+
     def test_want_directory_exclude(self):
         """
         Test wantDirectory with exclude parameter
@@ -296,7 +464,7 @@ class TestSkipNose(TestCase):
             '/test/foo/nonapi/foldertwo/morestuff',
             '/test/foo/nonapi/foldertwo/toomuch',
         ]
-        self.plugin.skipnose_exclude = ['api']
+        self.plugin.skipnose_exclude = [compile_path_glob('api')]
         self._test_paths(valid)
 
     def test_want_directory_exclude_multiple(self):
@@ -323,7 +491,10 @@ class TestSkipNose(TestCase):
             '/test/foo/nonapi/foldertwo/morestuff',  # noqa implicitly skipped by walk
             '/test/foo/nonapi/foldertwo/toomuch',  # implicitly skipped by walk
         ]
-        self.plugin.skipnose_exclude = ['api', 'foo']
+        self.plugin.skipnose_exclude = [
+            compile_path_glob('api'),
+            compile_path_glob('foo'),
+        ]
         self._test_paths(valid)
 
     def test_start_test_no_tests_to_skip(self):
@@ -374,3 +545,332 @@ class TestSkipNose(TestCase):
         self.assertTrue(callable(replaced_method))
         with self.assertRaises(SkipTest):
             replaced_method()
+
+
+@mock.patch('skipnose.skipnose.print', mock.MagicMock(), create=True)
+class TestSkipNoseTests(TestCase):
+    """
+    Test class for skipnose test name filtering
+    """
+
+    def setUp(self):
+        super(TestSkipNoseTests, self).setUp()
+        self.plugin = SkipNose()
+        self.plugin.debug = True
+
+        class FooIntegration(object):
+            def test_one(self):
+                """"""
+
+            def test_two_slow(self):
+                """"""
+
+        class Bar(object):
+            def test_one(self):
+                """"""
+
+        def test_function():
+            """"""
+
+        FooIntegration.__module__ = 'foo'
+        Bar.__module__ = 'foo'
+        test_function.__module__ = 'foo'
+        self.foo = FooIntegration
+        self.bar = Bar
+        self.function = test_function
+
+    def _method(self, cls, name):
+        method = mock.MagicMock(spec=['__self__', '__name__'])
+        method.__self__.cls = cls
+        method.__name__ = name
+        return method
+
+    def test_want_no_patterns(self):
+        """
+        Test that wanted hooks defer to nose without any patterns
+        """
+        self.assertIsNone(self.plugin.wantClass(self.foo))
+        self.assertIsNone(
+            self.plugin.wantMethod(self._method(self.foo, 'test_one'))
+        )
+        self.assertIsNone(self.plugin.wantFunction(self.function))
+
+    def test_want_method_not_method(self):
+        """
+        Test that wantMethod defers to nose when class cannot be determined
+        """
+        self.plugin.skipnose_test_exclude = [compile_glob('*')]
+
+        self.assertIsNone(self.plugin.wantMethod(mock.MagicMock(spec=[])))
+
+    def test_want_include(self):
+        """
+        Test wanted hooks with include parameter
+        """
+        self.plugin.skipnose_test_include = [[compile_glob('*Integration*')]]
+
+        self.assertIsNone(self.plugin.wantClass(self.foo))
+        self.assertFalse(self.plugin.wantClass(self.bar))
+        self.assertIsNone(
+            self.plugin.wantMethod(self._method(self.foo, 'test_one'))
+        )
+        self.assertFalse(
+            self.plugin.wantMethod(self._method(self.bar, 'test_one'))
+        )
+        self.assertFalse(self.plugin.wantFunction(self.function))
+
+    def test_want_include_method(self):
+        """
+        Test that class is wanted when any of its methods is included
+        """
+        self.plugin.skipnose_test_include = [[compile_glob('*.test_two_*')]]
+
+        self.assertIsNone(self.plugin.wantClass(self.foo))
+        self.assertFalse(self.plugin.wantClass(self.bar))
+        self.assertIsNone(
+            self.plugin.wantMethod(self._method(self.foo, 'test_two_slow'))
+        )
+        self.assertFalse(
+            self.plugin.wantMethod(self._method(self.foo, 'test_one'))
+        )
+
+    def test_want_include_multiple_or(self):
+        """
+        Test wanted hooks with multiple include OR parameters
+        """
+        self.plugin.skipnose_test_include = [
+            [compile_glob('foo.Bar'), compile_glob('foo.test_*')],
+        ]
+
+        self.assertFalse(self.plugin.wantClass(self.foo))
+        self.assertIsNone(self.plugin.wantClass(self.bar))
+        self.assertIsNone(self.plugin.wantFunction(self.function))
+
+    def test_want_include_multiple_and(self):
+        """
+        Test wanted hooks with multiple include AND parameters
+        """
+        self.plugin.skipnose_test_include = [
+            [compile_glob('foo.*')],
+            [compile_glob('*.test_one')],
+        ]
+
+        self.assertIsNone(self.plugin.wantClass(self.foo))
+        self.assertIsNone(
+            self.plugin.wantMethod(self._method(self.foo, 'test_one'))
+        )
+        self.assertFalse(
+            self.plugin.wantMethod(self._method(self.foo, 'test_two_slow'))
+        )
+        self.assertFalse(self.plugin.wantFunction(self.function))
+
+    def test_want_exclude(self):
+        """
+        Test wanted hooks with exclude parameter
+        """
+        self.plugin.skipnose_test_exclude = [
+            compile_glob('*_slow'),
+            compile_glob('foo.Bar'),
+        ]
+
+        self.assertIsNone(self.plugin.wantClass(self.foo))
+        self.assertFalse(self.plugin.wantClass(self.bar))
+        self.assertIsNone(
+            self.plugin.wantMethod(self._method(self.foo, 'test_one'))
+        )
+        self.assertFalse(
+            self.plugin.wantMethod(self._method(self.foo, 'test_two_slow'))
+        )
+        self.assertIsNone(self.plugin.wantFunction(self.function))
+
+
+@mock.patch('skipnose.skipnose.print', mock.MagicMock(), create=True)
+class TestSkipNoseCache(TestCase):
+    """
+    Test class for skipnose result cache
+    """
+
+    def setUp(self):
+        super(TestSkipNoseCache, self).setUp()
+        self.plugin = SkipNose()
+        self.plugin.debug = True
+        self.plugin.skipnose_cache = mock.MagicMock()
+
+    def _test(self, filename):
+        return mock.MagicMock(
+            address=mock.MagicMock(return_value=(filename, None, None)),
+        )
+
+    def test_want_file_no_cache(self):
+        """
+        Test that wantFile defers to nose without cache
+        """
+        self.plugin.skipnose_cache = None
+
+        self.assertIsNone(self.plugin.wantFile('/foo/test_foo.py'))
+
+    def test_want_file_not_module(self):
+        """
+        Test that wantFile ignores non-python files and packages
+        """
+        self.assertIsNone(self.plugin.wantFile('/foo/data.json'))
+        self.assertIsNone(self.plugin.wantFile('/foo/__init__.py'))
+        self.assertFalse(self.plugin.skipnose_cache.is_passed.called)
+
+    def test_want_file_not_passed(self):
+        """
+        Test that wantFile loads modules without cached pass
+        and remembers their digest at load time
+        """
+        self.plugin.skipnose_cache.is_passed.return_value = False
+        self.plugin.skipnose_cache.digest.return_value = 'digest'
+
+        self.assertIsNone(self.plugin.wantFile('/foo/test_foo.py'))
+        self.assertIsNone(self.plugin.loadTestsFromDir('/foo'))
+        self.assertEqual(
+            self.plugin._loaded_modules,
+            {'/foo/test_foo.py': 'digest'}
+        )
+
+    def test_want_file_passed(self):
+        """
+        Test that cached modules are not loaded and instead
+        are reported as skipped for their directory
+        """
+        self.plugin.skipnose_cache.is_passed.return_value = True
+
+        self.assertFalse(self.plugin.wantFile('/foo/test_foo.py'))
+        self.plugin.skipnose_cache.is_passed.assert_called_once_with(
+            '/foo/test_foo.py'
+        )
+
+        self.assertIsNone(self.plugin.loadTestsFromDir('/bar'))
+        tests = self.plugin.loadTestsFromDir('/foo')
+        self.assertEqual(len(tests), 1)
+        self.assertEqual(tests[0].address()[0], '/foo/test_foo.py')
+        with self.assertRaises(SkipTest):
+            tests[0].runTest()
+        self.assertIsNone(self.plugin.loadTestsFromDir('/foo'))
+
+    def test_get_test_file_context(self):
+        """
+        Test that _get_test_file uses suite context without address
+        """
+        module = mock.MagicMock(__file__='/foo/test_foo.pyc')
+        test = mock.MagicMock(spec=['context'], context=module)
+
+        self.assertEqual(
+            self.plugin._get_test_file(test),
+            '/foo/test_foo.py'
+        )
+        self.assertIsNone(
+            self.plugin._get_test_file(mock.MagicMock(spec=[]))
+        )
+
+    def _load(self, *paths):
+        self.plugin.skipnose_cache.is_passed.return_value = False
+        self.plugin.skipnose_cache.digest.side_effect = (
+            lambda i: 'digest {}'.format(i)
+        )
+        for path in paths:
+            self.plugin.wantFile(path)
+
+    def test_finalize(self):
+        """
+        Test that finalize records outcomes of executed modules
+        and does not record passes of modules with skipped tests
+        """
+        self._load('/foo/test_foo.py', '/foo/test_bar.py', '/foo/test_skip.py')
+        self.plugin.startTest(self._test('/foo/test_foo.py'))
+        self.plugin.startTest(self._test('/foo/test_bar.py'))
+        self.plugin.startTest(self._test('/foo/test_skip.py'))
+        self.plugin.addFailure(self._test('/foo/test_bar.py'), (None,) * 3)
+        self.plugin.addError(
+            self._test('/foo/test_skip.py'), (SkipTest, None, None)
+        )
+
+        self.plugin.finalize(None)
+
+        self.plugin.skipnose_cache.record_pass.assert_called_once_with(
+            '/foo/test_foo.py', 'digest /foo/test_foo.py'
+        )
+        self.plugin.skipnose_cache.record_failure.assert_called_once_with(
+            '/foo/test_bar.py'
+        )
+        self.plugin.skipnose_cache.save.assert_called_once_with()
+
+    def test_finalize_cached_pass(self):
+        """
+        Test that reported cached passes do not mark modules as skipped
+        """
+        self._load('/foo/test_foo.py')
+        self.plugin.startTest(self._test('/foo/test_foo.py'))
+        self.plugin.addError(
+            self._test('/foo/test_cached.py'), (SkipTest, None, None)
+        )
+
+        self.assertSetEqual(self.plugin._skipped_modules, set())
+
+    def test_finalize_not_loaded(self):
+        """
+        Test that finalize does not record passes of modules which
+        were not discovered hence might have run only partially
+        """
+        self.plugin.startTest(self._test('/foo/test_foo.py'))
+        self.plugin.startTest(self._test('/foo/test_bar.py'))
+        self.plugin.addFailure(self._test('/foo/test_bar.py'), (None,) * 3)
+
+        self.plugin.finalize(None)
+
+        self.assertFalse(self.plugin.skipnose_cache.record_pass.called)
+        self.plugin.skipnose_cache.record_failure.assert_called_once_with(
+            '/foo/test_bar.py'
+        )
+
+    @mock.patch('skipnose.skipnose.ResultCache')
+    def test_finalize_partial_run(self, mock_result_cache):
+        """
+        Test that finalize does not record passes when only
+        some tests within modules are addressed
+        """
+        mock_options = mock.MagicMock(
+            skipnose_include=[],
+            skipnose_exclude=[],
+            skipnose_test_include=[],
+            skipnose_test_exclude=[],
+            skipnose_skip_tests=None,
+            skipnose_cache='cache.json',
+        )
+        mock_conf = mock.MagicMock(
+            testNames=['tests', 'tests/test_a.py:A.test_ok'],
+        )
+        self.plugin.configure(mock_options, mock_conf)
+        self._load('/foo/test_foo.py')
+
+        self.plugin.startTest(self._test('/foo/test_foo.py'))
+        self.plugin.finalize(None)
+
+        self.assertFalse(self.plugin.skipnose_cache.record_pass.called)
+        self.plugin.skipnose_cache.save.assert_called_once_with()
+
+    def test_finalize_unknown_failure(self):
+        """
+        Test that finalize does not record passes when
+        failure module cannot be determined
+        """
+        self._load('/foo/test_foo.py')
+        self.plugin.startTest(self._test('/foo/test_foo.py'))
+        self.plugin.addError(mock.MagicMock(spec=[]), (ValueError,) * 3)
+
+        self.plugin.finalize(None)
+
+        self.assertFalse(self.plugin.skipnose_cache.record_pass.called)
+        self.plugin.skipnose_cache.save.assert_called_once_with()
+
+    def test_finalize_no_cache(self):
+        """
+        Test that finalize does nothing without cache
+        """
+        self.plugin.skipnose_cache = None
+
+        self.assertIsNone(self.plugin.finalize(None))
@@ -0,0 +1,437 @@
+from __future__ import print_function, unicode_literals
+import os
+import re
+import runpy
+import shutil
+import sys
+import tempfile
+import types
+from unittest import TestCase
+
+import mock
+
+from skipnose.watch import DirectoryIndex, Watcher, main, parse_args
+
+
+class TestDirectoryIndex(TestCase):
+    """
+    Test class for watch directory index
+    """
+
+    def setUp(self):
+        super(TestDirectoryIndex, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.plugin = mock.MagicMock()
+        self.plugin.is_excluded.side_effect = (
+            lambda i: os.path.basename(i) == 'excluded'
+        )
+        self.index = DirectoryIndex(self.plugin, [self.root])
+
+    def tearDown(self):
+        super(TestDirectoryIndex, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _write(self, path, content=''):
+        path = os.path.join(self.root, path)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fid:
+            fid.write(content)
+        return path
+
+    def _touch(self, path, mtime):
+        os.utime(os.path.join(self.root, path), (mtime, mtime))
+
+    def test_build(self):
+        """
+        Test that build indexes only python files in wanted directories
+        """
+        self._write('foo/test_foo.py')
+        self._write('foo/data.json')
+        self._write('excluded/test_bar.py')
+        self._write('.hidden/test_bar.py')
+        self._write('venv/pyvenv.cfg')
+        self._write('venv/lib/site-packages/foo.py')
+
+        self.index.build()
+
+        self.assertEqual(
+            list(self.index.files),
+            [os.path.join(self.root, 'foo', 'test_foo.py')]
+        )
+        self.assertEqual(
+            sorted(self.index.dirs),
+            [self.root, os.path.join(self.root, 'foo')]
+        )
+
+    def test_poll(self):
+        """
+        Test that poll reports modified, added and removed files
+        """
+        modified = self._write('foo/test_foo.py')
+        removed = self._write('foo/test_removed.py')
+        self.index.build()
+
+        self.assertListEqual(self.index.poll(), [])
+
+        self._write('foo/test_foo.py', 'changed')
+        os.remove(removed)
+        added = self._write('foo/bar/test_bar.py')
+        self._write('foo/excluded/test_bar.py')
+        # make sure mtime changes even on low resolution filesystems
+        self._touch('foo', 1)
+
+        self.assertListEqual(
+            self.index.poll(),
+            sorted([modified, removed, added])
+        )
+        self.assertListEqual(self.index.poll(), [])
+
+    def test_poll_clears_subfolders(self):
+        """
+        Test that poll clears memoized subfolders only when
+        new directories are added
+        """
+        self._write('foo/test_foo.py')
+        self._write('foo/excluded/test_bar.py')
+        self.index.build()
+
+        self._write('foo/test_new.py')
+        self._touch('foo', 1)
+        self.index.poll()
+        self.assertFalse(self.plugin.clear_subfolders.called)
+
+        self._write('foo/bar/test_bar.py')
+        self._touch('foo', 2)
+        self.index.poll()
+        self.plugin.clear_subfolders.assert_called_once_with()
+
+    def test_poll_removed_directory(self):
+        """
+        Test that poll reports files within removed directories
+        """
+        removed = self._write('foo/bar/test_bar.py')
+        self.index.build()
+
+        shutil.rmtree(os.path.join(self.root, 'foo'))
+
+        self.assertListEqual(self.index.poll(), [removed])
+        self.assertEqual(list(self.index.dirs), [self.root])
+
+
+class TestWatcher(TestCase):
+    """
+    Test class for watcher
+    """
+
+    def setUp(self):
+        super(TestWatcher, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self._write('setup.py')
+        self._write('mylib/__init__.py', 'VALUE = 1\n')
+        self._write('mylib/utils.py', 'from mylib import VALUE\n')
+        self._write('tests/__init__.py')
+        self._write('tests/api/__init__.py')
+        self._write('tests/api/helpers.py')
+        self._write('tests/api/test_api.py', 'from mylib import utils\n')
+        self._write('tests/test_foo.py')
+
+        self.watcher = self._watcher(['-v', 'tests'], ['tests'])
+
+    def _watcher(self, argv, test_names):
+        self.config = mock.MagicMock(
+            workingDir=self.root,
+            testNames=test_names,
+            testMatch=re.compile(r'(?:^|[\b_\.-])[Tt]est'),
+        )
+        with mock.patch('skipnose.watch.Config') as mock_config, \
+                mock.patch('skipnose.watch.PluginManager'), \
+                mock.patch('skipnose.watch.all_config_files'), \
+                mock.patch('skipnose.watch.DefaultPluginManager') as mock_dpm:
+            mock_config.return_value = self.config
+            mock_dpm.return_value.plugins = [mock.sentinel.plugin]
+            self.mock_default_plugin_manager = mock_dpm
+            return Watcher(argv)
+
+    def tearDown(self):
+        super(TestWatcher, self).tearDown()
+        shutil.rmtree(self.root)
+
+    def _path(self, path):
+        return os.path.join(self.root, *path.split('/'))
+
+    def _write(self, path, content=''):
+        path = self._path(path)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fid:
+            fid.write(content)
+        return path
+
+    def test_init(self):
+        """
+        Test that watcher configures nose once and determines roots
+        """
+        self.assertListEqual(
+            self.watcher.argv,
+            ['nosetests', '--with-skipnose', '-v', 'tests']
+        )
+        self.mock_default_plugin_manager.return_value \
+            .addPlugins.assert_called_once_with(
+                extraplugins=[self.watcher.plugin]
+            )
+        self.assertListEqual(self.watcher.plugins, [mock.sentinel.plugin])
+        self.config.configure.assert_called_once_with(self.watcher.argv)
+        self.assertListEqual(self.watcher.test_roots, [self._path('tests')])
+        self.assertSetEqual(self.watcher.test_files, set())
+        self.assertEqual(self.watcher.source_roots[0], self.root)
+        self.assertListEqual(self.watcher.index.roots, [self.root])
+
+    def test_init_no_test_names(self):
+        """
+        Test that watcher collects tests in working directory
+        when no test names are given
+        """
+        watcher = self._watcher(['-v'], [])
+
+        self.assertListEqual(watcher.test_roots, [self.root])
+        self.assertSetEqual(watcher.test_files, set())
+
+    def test_init_test_modules(self):
+        """
+        Test that test modules given either as files or dotted names
+        are not widened to the working directory
+        """
+        watcher = self._watcher(['tests/test_foo.py', 'tests.api:Foo'], [
+            'tests/test_foo.py',
+            'tests.api.test_api:Foo.test_foo',
+            'tests.missing',
+        ])
+
+        self.assertListEqual(watcher.test_roots, [])
+        self.assertSetEqual(watcher.test_files, set([
+            self._path('tests/test_foo.py'),
+            self._path('tests/api/test_api.py'),
+        ]))
+        self.assertListEqual(watcher.index.roots, [self.root])
+
+    def test_affected_test_file(self):
+        """
+        Test that only the given test module is ever rerun
+        when test name is a single file
+        """
+        watcher = self._watcher(['tests/test_foo.py'], ['tests/test_foo.py'])
+        watcher.update_imports([self._path('tests/api/test_api.py')])
+
+        self.assertListEqual(
+            watcher.affected([self._path('tests/test_foo.py')]),
+            [self._path('tests/test_foo.py')]
+        )
+        self.assertFalse(
+            watcher.is_test_module(self._path('tests/api/test_api.py'))
+        )
+        # not a test module hence all given tests are rerun
+        self.assertIsNone(
+            watcher.affected([self._path('tests/api/test_api.py')])
+        )
+        self.assertIsNone(watcher.affected([self._path('mylib/utils.py')]))
+
+    def test_affected_test_modules(self):
+        """
+        Test that affected reruns changed test modules by themselves
+        """
+        actual = self.watcher.affected([
+            self._path('tests/test_foo.py'),
+            self._path('tests/api/test_api.py'),
+        ])
+
+        self.assertListEqual(actual, [
+            self._path('tests/api/test_api.py'),
+            self._path('tests/test_foo.py'),
+        ])
+
+    def test_affected_importers(self):
+        """
+        Test that affected reruns test modules which import changed
+        file even transitively
+        """
+        self.watcher.update_imports([
+            self._path('mylib/utils.py'),
+            self._path('tests/api/test_api.py'),
+        ])
+
+        actual = self.watcher.affected([self._path('mylib/__init__.py')])
+
+        self.assertListEqual(actual, [self._path('tests/api/test_api.py')])
+
+    def test_affected_test_helper(self):
+        """
+        Test that affected reruns directory of changed files within tests
+        which are not imported by any test module
+        """
+        actual = self.watcher.affected([
+            self._path('tests/api/helpers.py'),
+            self._path('tests/api/test_api.py'),
+        ])
+
+        self.assertListEqual(actual, [self._path('tests/api')])
+
+    def test_affected_fallback(self):
+        """
+        Test that affected reruns all tests when changed file
+        outside of tests is not imported by any test module
+        """
+        actual = self.watcher.affected([
+            self._path('tests/test_foo.py'),
+            self._path('setup.py'),
+        ])
+
+        self.assertIsNone(actual)
+
+    @mock.patch('skipnose.watch.WatchTestProgram')
+    def test_run(self, mock_program):
+        """
+        Test that run removes only local modules imported by
+        previous run and passes targets to nose
+        """
+        modules = {
+            'skipnose_watch_local': self._path('mylib/local.py'),
+            'skipnose_watch_site': self._path('lib/site-packages/site.py'),
+            'skipnose_watch_other': os.path.join(
+                os.path.dirname(self.root), 'other.py'
+            ),
+        }
+        for name, filename in modules.items():
+            module = types.ModuleType(str(name))
+            module.__file__ = filename
+            sys.modules[name] = module
+        self.addCleanup(lambda: [sys.modules.pop(i, None) for i in modules])
+
+        actual = self.watcher.run([self._path('tests/test_foo.py')])
+
+        self.assertNotIn('skipnose_watch_local', sys.modules)
+        self.assertIn('skipnose_watch_site', sys.modules)
+        self.assertIn('skipnose_watch_other', sys.modules)
+        self.assertEqual(actual, mock_program.return_value.success)
+        mock_program.assert_called_once_with(
+            targets=[self._path('tests/test_foo.py')],
+            argv=self.watcher.argv,
+            config=mock.ANY,
+            exit=False,
+        )
+
+    @mock.patch('time.sleep')
+    def test_watch(self, mock_sleep):
+        """
+        Test that watch runs all tests first and then reruns
+        affected tests on changes
+        """
+        mock_sleep.side_effect = [None, None, None, KeyboardInterrupt]
+        self.watcher.run = mock.MagicMock()
+        self.watcher.index.poll = mock.MagicMock(side_effect=[
+            [],
+            [self._path('tests/test_foo.py')],
+            [self._path('setup.py')],
+        ])
+
+        with mock.patch('skipnose.watch.print', create=True):
+            with self.assertRaises(KeyboardInterrupt):
+                self.watcher.watch(0.1)
+
+        self.assertListEqual(self.watcher.run.call_args_list, [
+            mock.call(),
+            mock.call([self._path('tests/test_foo.py')]),
+            mock.call(),
+        ])
+        self.assertIn(self._path('tests/api/test_api.py'),
+                      self.watcher.imports)
+
+
+class TestMain(TestCase):
+    """
+    Test class for watch command line interface
+    """
+
+    def test_parse_args(self):
+        """
+        Test that parse_args passes all other arguments to nose
+        """
+        self.assertEqual(
+            parse_args(['watch', '-sv', 'tests']),
+            (0.5, ['-sv', 'tests'])
+        )
+
+    def test_parse_args_command_anywhere(self):
+        """
+        Test that watch command can be given after nose arguments
+        """
+        self.assertEqual(
+            parse_args(['--skipnose-include', 'api', 'watch']),
+            (0.5, ['--skipnose-include', 'api'])
+        )
+
+    def test_parse_args_interval(self):
+        """
+        Test that parse_args recognizes only exact watch interval option
+        """
+        self.assertEqual(
+            parse_args(['watch', '--watch-interval', '1', '--watch']),
+            (1.0, ['--watch'])
+        )
+        self.assertEqual(
+            parse_args(['watch', '--watch-interval=2']),
+            (2.0, [])
+        )
+
+    def test_parse_args_errors(self):
+        """
+        Test that parse_args raises ValueError for invalid arguments
+        """
+        with self.assertRaises(ValueError):
+            parse_args(['-sv'])
+        with self.assertRaises(ValueError):
+            parse_args(['watch', '--watch-interval'])
+        with self.assertRaises(ValueError):
+            parse_args(['watch', '--watch-interval=foo'])
+        with self.assertRaises(ValueError):
+            parse_args(['watch', '--watch-interval=0'])
+        with self.assertRaises(ValueError):
+            parse_args(['watch', '--watch-interval', '-1'])
+        with self.assertRaises(ValueError):
+            parse_args(['watch', '--watch-interval=nan'])
+
+    @mock.patch('skipnose.watch.Watcher')
+    def test_main(self, mock_watcher):
+        """
+        Test that main starts watcher and exits on keyboard interrupt
+        """
+        mock_watcher.return_value.watch.side_effect = KeyboardInterrupt
+
+        self.assertEqual(main(['-sv', 'watch', '--watch-interval=1']), 0)
+
+        mock_watcher.assert_called_once_with(['-sv'])
+        mock_watcher.return_value.watch.assert_called_once_with(1.0)
+
+    @mock.patch('skipnose.watch.Watcher')
+    def test_main_error(self, mock_watcher):
+        """
+        Test that main prints usage for invalid arguments
+        """
+        with mock.patch('skipnose.watch.print', create=True) as mock_print:
+            self.assertEqual(main(['-sv']), 2)
+
+        self.assertTrue(mock_print.called)
+        self.assertFalse(mock_watcher.called)
+
+    @mock.patch('skipnose.watch.main')
+    def test_module_main(self, mock_main):
+        """
+        Test that python -m skipnose exits with status of main
+        """
+        mock_main.return_value = 0
+
+        with self.assertRaises(SystemExit) as e:
+            runpy.run_module('skipnose', run_name='__main__')
+
+        self.assertEqual(e.exception.code, 0)
+        mock_main.assert_called_once_with()